@@ -1,22 +1,72 @@
-#From codereview.stackexchange.com                    
+
+#Originally from codereview.stackexchange.com, now built on
+#restricted_growth_partitions below
 def partitions(set_):
-    if not set_:
+    for labels in restricted_growth_partitions(set_):
+        parts = [set() for i in range(max(labels, default=-1) + 1)]
+        for item, label in zip(set_, labels):
+            parts[label].add(item)
+        yield parts
+
+
+# Walks every partition of items without recursion.  A partition is written as
+# a restricted growth string: labels[i] is the block holding items[i], and each
+# label is at most one more than the largest label before it.  The same labels
+# list is yielded every time and changed in place afterwards, so copy it if you
+# need to keep it.
+#
+# If predicate is given it is called with the (reused) list of items in a block
+# each time an item joins that block; returning False skips every partition
+# that contains that block.  This is only safe for predicates that stay False
+# when more items are added, such as "block weight <= limit".
+def restricted_growth_partitions(items, predicate=None):
+    items = list(items)
+    n = len(items)
+    if n == 0:
         yield []
         return
-    for i in range(2**len(set_)//2):
-        parts = [set(), set()]
-        for item in set_:
-            parts[i&1].add(item)
-            i >>= 1
-        for b in partitions(parts[1]):
-            yield [parts[0]]+b
+    labels = [-1] * n
+    blocks = [[] for i in range(n)]
+    # used[i] is the number of blocks holding items[0], ..., items[i - 1]
+    used = [0] * (n + 1)
+    i = 0
+    while i >= 0:
+        label = labels[i]
+        if label >= 0:
+            blocks[label].pop()
+        label += 1
+        while label <= used[i]:
+            blocks[label].append(items[i])
+            if predicate is None or predicate(blocks[label]):
+                break
+            blocks[label].pop()
+            label += 1
+        if label > used[i]:
+            labels[i] = -1
+            i -= 1
+            continue
+        labels[i] = label
+        used[i + 1] = max(used[i], label + 1)
+        if i == n - 1:
+            yield labels
+        else:
+            i += 1
 
 
-# This is a helper function that will fetch all of the available 
+# This is a helper function that will fetch all of the available
 # partitions for you to use for your brute force algorithm.
-def get_partitions(set_):
-    for partition in partitions(set_):
-        yield [list(elt) for elt in partition]
+# With as_lists=False the shared labels list from restricted_growth_partitions
+# is yielded instead of building a list of lists for every partition.
+def get_partitions(set_, predicate=None, as_lists=True):
+    items = list(set_)
+    for labels in restricted_growth_partitions(items, predicate):
+        if not as_lists:
+            yield labels
+            continue
+        parts = [[] for i in range(max(labels, default=-1) + 1)]
+        for item, label in zip(items, labels):
+            parts[label].append(item)
+        yield parts
 
 ### Uncomment the following code  and run this file
 ### to see what get_partitions does if you want to visualize it:
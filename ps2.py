@@ -1,11 +1,32 @@
 # 6.00.2x Problem Set 2: Simulating robots
 
+import array
+import concurrent.futures
+import contextlib
+import gc
+import hashlib
+import heapq
+import itertools
+import json
 import math
+import os
 import random
+import statistics
+import sys
+import time
 
-import ps2_visualize
+import numpy as np
+
+try:
+    import ps2_visualize
+except ImportError:
+    # ps2_visualize needs a display; without one, traces can still be
+    # recorded and analyzed offline with ps2_trace
+    ps2_visualize = None
 import pylab
 
+from ps2_trace import TrajectoryRecorder
+
 ##################
 ## Comment/uncomment the relevant lines, depending on which version of Python you have
 ##################
@@ -23,7 +44,12 @@ import pylab
 class Position(object):
     """
     A Position represents a location in a two-dimensional room.
+
+    Positions are small value objects with slots rather than an instance
+    dictionary, as the robots make one every time they move.
     """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         """
         Initializes a position with coordinates (x, y).
@@ -50,11 +76,11 @@ class Position(object):
 
         Returns: a Position object representing the new position.
         """
-        old_x, old_y = self.getX(), self.getY()
-        angle = float(angle)
+        old_x, old_y = self.x, self.y
+        angle = math.radians(float(angle))
         # Compute the change in position
-        delta_y = speed * math.cos(math.radians(angle))
-        delta_x = speed * math.sin(math.radians(angle))
+        delta_y = speed * math.cos(angle)
+        delta_x = speed * math.sin(angle)
         # Add that to the existing position
         new_x = old_x + delta_x
         new_y = old_y + delta_y
@@ -72,6 +98,10 @@ class RectangularRoom(object):
 
     A room has a width and a height and contains (width * height) tiles. At any
     particular time, each of these tiles is either clean or dirty.
+
+    The tiles are kept in a bytearray, one byte per tile, column by column,
+    along with a count of the clean tiles that is updated whenever a dirty
+    tile is cleaned, so getNumCleanedTiles takes constant time.
     """
     def __init__(self, width, height):
         """
@@ -84,11 +114,8 @@ class RectangularRoom(object):
         """
         self.width = width
         self.height = height
-        self.cellStates = []
-        for x in range(width):
-            self.cellStates.append([])
-            for y in range(height):
-                self.cellStates[x].append(False)       
+        self.tiles = bytearray(width * height)
+        self.numCleaned = 0
 
     def cleanTileAtPosition(self, pos):
         """
@@ -98,9 +125,24 @@ class RectangularRoom(object):
 
         pos: a Position
         """
-        x = int(pos.getX())
-        y = int(pos.getY())
-        self.cellStates[x][y] = True
+        self.cleanTileAt(pos.x, pos.y)
+
+    def cleanTileAt(self, x, y):
+        """
+        Mark the tile under the point (x, y) as cleaned.
+
+        Assumes that (x, y) is a valid point inside this room.
+
+        x: a float
+        y: a float
+        returns: True if the tile was dirty until now, False otherwise
+        """
+        tile = int(x) * self.height + int(y)
+        if self.tiles[tile]:
+            return False
+        self.tiles[tile] = 1
+        self.numCleaned += 1
+        return True
                
     def isTileCleaned(self, m, n):
         """
@@ -112,7 +154,7 @@ class RectangularRoom(object):
         n: an integer
         returns: True if (m, n) is cleaned, False otherwise
         """
-        return self.cellStates[m][n]
+        return self.tiles[m * self.height + n] == 1
     
     def getNumTiles(self):
         """
@@ -128,12 +170,7 @@ class RectangularRoom(object):
 
         returns: an integer
         """
-        counter = 0
-        for x in range(self.width):
-            for y in range(self.height):
-                if self.cellStates[x][y] == True:
-                    counter += 1
-        return counter
+        return self.numCleaned
 
     def getRandomPosition(self):
         """
@@ -152,12 +189,287 @@ class RectangularRoom(object):
         pos: a Position object.
         returns: True if pos is in the room, False otherwise.
         """
-        x = pos.getX()
-        y = pos.getY()
-        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+        return self.isPointInRoom(pos.x, pos.y)
+
+    def isPointInRoom(self, x, y):
+        """
+        Return True if the point (x, y) is inside the room.
+
+        x: a float
+        y: a float
+        returns: True if (x, y) is in the room, False otherwise.
+        """
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def cleanPointIfInRoom(self, x, y):
+        """
+        Mark the tile under the point (x, y) as cleaned if the point is inside
+        the room.  This is what a moving robot does each time-step, so the
+        tile is found only once for both the check and the marking.
+
+        x: a float
+        y: a float
+        returns: True if (x, y) is in the room, False otherwise.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            tile = int(x) * self.height + int(y)
+            if not self.tiles[tile]:
+                self.tiles[tile] = 1
+                self.numCleaned += 1
+            return True
+        return False
+
+class SparseRectangularRoom(RectangularRoom):
+    """
+    A SparseRectangularRoom is a RectangularRoom for floors too large to hold
+    a flag for every tile.  Tiles are grouped in CHUNK_SIZE x CHUNK_SIZE
+    chunks, one bit per tile, and a chunk is only allocated when one of its
+    tiles is cleaned, so memory grows with the area the robots have visited
+    rather than with the size of the room.  Every chunk keeps its own count
+    of clean tiles alongside the count for the whole room.
+    """
+    CHUNK_SIZE = 64
+
+    def __init__(self, width, height):
+        """
+        Initializes a sparse rectangular room with the specified width and
+        height.
+
+        Initially, no tiles in the room have been cleaned.
+
+        width: an integer > 0
+        height: an integer > 0
+        """
+        self.width = width
+        self.height = height
+        self.chunksHigh = -(-height // self.CHUNK_SIZE)
+        self.chunks = {}        # chunk number -> bytearray of tile bits
+        self.chunkCounts = {}   # chunk number -> number of clean tiles
+        self.numCleaned = 0
+
+    def locateTile(self, m, n):
+        """
+        Returns the chunk number of tile (m, n), and the byte and bit mask of
+        the tile within its chunk.
+        """
+        size = self.CHUNK_SIZE
+        chunk = (m // size) * self.chunksHigh + n // size
+        bit = (m % size) * size + n % size
+        return chunk, bit >> 3, 1 << (bit & 7)
+
+    def cleanTileAt(self, x, y):
+        """
+        Mark the tile under the point (x, y) as cleaned.
+
+        Assumes that (x, y) is a valid point inside this room.
+
+        x: a float
+        y: a float
+        returns: True if the tile was dirty until now, False otherwise
+        """
+        chunk, byte, mask = self.locateTile(int(x), int(y))
+        bits = self.chunks.get(chunk)
+        if bits is None:
+            bits = self.chunks[chunk] = bytearray(self.CHUNK_SIZE * self.CHUNK_SIZE // 8)
+            self.chunkCounts[chunk] = 0
+        elif bits[byte] & mask:
             return False
-        else:
+        bits[byte] |= mask
+        self.chunkCounts[chunk] += 1
+        self.numCleaned += 1
+        return True
+
+    def isTileCleaned(self, m, n):
+        """
+        Return True if the tile (m, n) has been cleaned.
+
+        Assumes that (m, n) represents a valid tile inside the room.
+
+        m: an integer
+        n: an integer
+        returns: True if (m, n) is cleaned, False otherwise
+        """
+        chunk, byte, mask = self.locateTile(m, n)
+        bits = self.chunks.get(chunk)
+        return bits is not None and bits[byte] & mask != 0
+
+    def cleanPointIfInRoom(self, x, y):
+        """
+        Mark the tile under the point (x, y) as cleaned if the point is inside
+        the room.
+
+        x: a float
+        y: a float
+        returns: True if (x, y) is in the room, False otherwise.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.cleanTileAt(x, y)
             return True
+        return False
+
+    def getNumAllocatedChunks(self):
+        """
+        Return the number of chunks holding at least one clean tile.
+
+        returns: an integer
+        """
+        return len(self.chunks)
+
+class ObstacleRoom(RectangularRoom):
+    """
+    An ObstacleRoom is a RectangularRoom with furniture: some of its tiles
+    are blocked, and robots can neither stand on nor clean them.
+
+    Blocked tiles are marked once, when the room is made, in the tiles
+    bytearray itself (as BLOCKED_TILE rather than 0 or 1), so checking a point
+    reads the same byte that cleaning it will, and costs about the same as in
+    an empty room.  Cleaning skips blocked tiles like clean ones, and
+    getNumTiles only counts free tiles, so min_coverage is a fraction of the
+    free floor (robots only check where they land, so a fast robot can step
+    over a thin wall, and free tiles that no robot can reach still count).
+
+    To use it with runSimulation, fix the mask with functools.partial, e.g.
+    room_type=functools.partial(ObstacleRoom, blocked=loadOccupancyMask(f)).
+    """
+    BLOCKED_TILE = 2
+
+    def __init__(self, width, height, blocked):
+        """
+        Initializes a room with the specified width and height in which the
+        tiles marked in BLOCKED cannot be entered.
+
+        Initially, no tiles in the room have been cleaned.
+
+        width: an integer > 0
+        height: an integer > 0
+        blocked: HEIGHT rows of WIDTH values (a list of lists or a numpy
+                 array, as returned by loadOccupancyMask), where
+                 blocked[n][m] is true if the tile (m, n) is blocked
+        """
+        RectangularRoom.__init__(self, width, height)
+        blocked = np.asarray(blocked, dtype=bool)
+        if blocked.shape != (height, width):
+            raise ValueError("blocked has shape %s, not (%d, %d)"
+                             % (blocked.shape, height, width))
+        #tile (m, n) is self.tiles[m * height + n], so blocked is transposed
+        self.tiles = bytearray((blocked.T * np.uint8(self.BLOCKED_TILE)).tobytes())
+        self.numFree = int(np.count_nonzero(~blocked))
+        if self.numFree == 0:
+            raise ValueError("every tile of the room is blocked")
+
+    def isTileBlocked(self, m, n):
+        """
+        Return True if the tile (m, n) is blocked.
+
+        m: an integer
+        n: an integer
+        returns: True if (m, n) is blocked, False otherwise
+        """
+        return self.tiles[m * self.height + n] == self.BLOCKED_TILE
+
+    def getNumTiles(self):
+        """
+        Return the number of tiles in the room that are not blocked.
+
+        returns: an integer
+        """
+        return self.numFree
+
+    def getRandomPosition(self):
+        """
+        Return a random position inside the room on a tile that is not
+        blocked.
+
+        returns: a Position object.
+        """
+        while True:
+            x = random.uniform(0, self.width)
+            y = random.uniform(0, self.height)
+            if self.isPointInRoom(x, y):
+                return Position(x, y)
+
+    def isPointInRoom(self, x, y):
+        """
+        Return True if the point (x, y) is inside the room and not on a
+        blocked tile.
+
+        x: a float
+        y: a float
+        returns: True if (x, y) is in the room, False otherwise.
+        """
+        return (0 <= x < self.width and 0 <= y < self.height
+                and self.tiles[int(x) * self.height + int(y)] != self.BLOCKED_TILE)
+
+    def cleanPointIfInRoom(self, x, y):
+        """
+        Mark the tile under the point (x, y) as cleaned if the point is inside
+        the room and not on a blocked tile.
+
+        x: a float
+        y: a float
+        returns: True if (x, y) is in the room, False otherwise.
+        """
+        if 0 <= x < self.width and 0 <= y < self.height:
+            tile = int(x) * self.height + int(y)
+            state = self.tiles[tile]
+            if not state:
+                self.tiles[tile] = 1
+                self.numCleaned += 1
+                return True
+            return state != self.BLOCKED_TILE
+        return False
+
+
+def loadOccupancyMask(filename, threshold=0.5):
+    """
+    Reads a floor plan from a PBM or PGM image (plain or raw) with one pixel
+    per tile, the top row of the image being the row of tiles with n = 0.
+    Black PBM pixels, and PGM pixels darker than THRESHOLD times the image's
+    maximum value, are blocked.
+
+    filename: a string
+    threshold: a float (0 < threshold <= 1)
+    returns: a numpy array of bools of shape (height, width), true where the
+             tile is blocked, to pass to ObstacleRoom
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    fields = []
+    position = 0
+    # the magic number, width, height and (except for PBM) maximum value,
+    # separated by whitespace and comments
+    while len(fields) < (3 if data[:2] in (b'P1', b'P4') else 4):
+        while position < len(data) and (data[position:position + 1].isspace()
+                                         or data[position:position + 1] == b'#'):
+            if data[position:position + 1] == b'#':
+                position = data.index(b'\n', position)
+            position += 1
+        start = position
+        while position < len(data) and not data[position:position + 1].isspace():
+            position += 1
+        if start == position:
+            raise ValueError("%s: truncated header" % filename)
+        fields.append(data[start:position])
+    magic = fields[0]
+    width, height = int(fields[1]), int(fields[2])
+    pixels = data[position + 1:]
+    if magic == b'P1':
+        values = np.frombuffer(pixels, np.uint8)
+        values = values[(values == ord('0')) | (values == ord('1'))]
+        return values[:width * height].reshape(height, width) == ord('1')
+    if magic == b'P4':
+        rows = np.frombuffer(pixels, np.uint8)[:height * ((width + 7) // 8)]
+        bits = np.unpackbits(rows.reshape(height, (width + 7) // 8), axis=1)
+        return bits[:, :width] == 1
+    maxValue = int(fields[3])
+    if magic == b'P2':
+        values = np.array(pixels.split()[:width * height], dtype=np.int64)
+    elif magic == b'P5':
+        values = np.frombuffer(pixels, '>u2' if maxValue > 255 else np.uint8)[:width * height]
+    else:
+        raise ValueError("%s is not a PBM or PGM image" % filename)
+    return values.reshape(height, width) < threshold * maxValue
+
 
 # === Problem 2
 class Robot(object):
@@ -169,6 +481,9 @@ class Robot(object):
 
     Subclasses of Robot should provide movement strategies by implementing
     updatePositionAndClean(), which simulates a single time-step.
+
+    Setting the direction also works out the step (stepX, stepY) the robot
+    takes in one time-step, so moving does not need any trigonometry.
     """
     def __init__(self, room, speed):
         """
@@ -218,6 +533,17 @@ class Robot(object):
         """
         self.direction = direction
 
+    @property
+    def direction(self):
+        return self.heading
+
+    @direction.setter
+    def direction(self, direction):
+        self.heading = direction
+        angle = math.radians(float(direction))
+        self.stepX = self.speed * math.sin(angle)
+        self.stepY = self.speed * math.cos(angle)
+
     def updatePositionAndClean(self):
         """
         Simulate the passage of a single time-step.
@@ -244,10 +570,10 @@ class StandardRobot(Robot):
         Move the robot to a new position and mark the tile it is on as having
         been cleaned.
         """
-        nextPos = self.position.getNewPosition(self.direction, self.speed)
-        if self.room.isPositionInRoom(nextPos):
-            self.position = nextPos
-            self.room.cleanTileAtPosition(nextPos) 
+        x = self.position.x + self.stepX
+        y = self.position.y + self.stepY
+        if self.room.cleanPointIfInRoom(x, y):
+            self.position = Position(x, y)
         else:
             self.direction = random.uniform(0, 360)
             
@@ -257,7 +583,8 @@ class StandardRobot(Robot):
 
 # === Problem 4
 def runSimulation(num_robots, speed, width, height, min_coverage, num_trials,
-                  robot_type):
+                  robot_type, workers=1, seed=None, fast_forward=False,
+                  room_type=RectangularRoom, profile=None):
     """
     Runs NUM_TRIALS trials of the simulation and returns the mean number of
     time-steps needed to clean the fraction MIN_COVERAGE of the room.
@@ -265,6 +592,23 @@ def runSimulation(num_robots, speed, width, height, min_coverage, num_trials,
     The simulation is run with NUM_ROBOTS robots of type ROBOT_TYPE, each with
     speed SPEED, in a room of dimensions WIDTH x HEIGHT.
 
+    With a SEED, trial i reseeds the random module with trialSeed(SEED, i)
+    before it starts, so the result depends only on the seed and is the same
+    for any number of WORKERS.  With more than one worker the trials are
+    spread over a process pool (drawing a seed at random if none is given).
+
+    With FAST_FORWARD, trials with StandardRobots are run by
+    runFastForwardTrial, which gives statistically the same times in far
+    fewer Python operations (other robot and room types ignore it).
+
+    ROOM_TYPE is called with the width and height to make each trial's room,
+    for example SparseRectangularRoom for very large rooms.
+
+    With a PROFILE (a SimulationProfile) the trials are run by
+    runProfiledTrial instead, and the timings and counts of every trial are
+    added to PROFILE; see SimulationProfile.report.  Without one the trials
+    run exactly as before, with no instrumentation at all.
+
     num_robots: an int (num_robots > 0)
     speed: a float (speed > 0)
     width: an int (width > 0)
@@ -273,29 +617,515 @@ def runSimulation(num_robots, speed, width, height, min_coverage, num_trials,
     num_trials: an int (num_trials > 0)
     robot_type: class of robot to be instantiated (e.g. StandardRobot or
                 RandomWalkRobot)
+    workers: an int, the number of processes to run the trials in
+    seed: an int, or None to use the random module as it is
+    fast_forward: a bool
+    room_type: class of room to be instantiated (e.g. RectangularRoom or
+               SparseRectangularRoom)
+    profile: a SimulationProfile, or None
     """
-    #counter for total time taken over all trials
-    totalTime = 0
-    #loop through for each trial
-    for x in range(num_trials):
+    if profile is not None:
+        results = runTrials(runProfiledTrial, num_trials, workers, seed,
+                            num_robots, speed, width, height, min_coverage,
+                            robot_type, room_type)
+        times = []
+        for timeSteps, trialProfile in results:
+            times.append(timeSteps)
+            profile.merge(trialProfile)
+        return sum(times) / num_trials
+    times = runTrials(runTrial, num_trials, workers, seed, num_robots, speed,
+                      width, height, min_coverage, robot_type, fast_forward,
+                      room_type)
+    #mean = total time / number of trials, summed in trial order
+    return sum(times) / num_trials
+
+
+def runTrials(trial_function, num_trials, workers, seed, *args):
+    """
+    Calls TRIAL_FUNCTION(*ARGS, trial_seed) once for each of NUM_TRIALS
+    trials and returns the results in trial order.  The trial seeds and the
+    use of WORKERS processes are as described for runSimulation.
+
+    trial_function: a function taking ARGS and a seed (an int or None)
+    num_trials: an int (num_trials > 0)
+    workers: an int, the number of processes to run the trials in
+    seed: an int, or None to use the random module as it is
+    returns: a list of the results of TRIAL_FUNCTION
+    """
+    if seed is None and workers > 1:
+        seed = random.getrandbits(64)
+    if seed is None:
+        seeds = [None] * num_trials
+    else:
+        seeds = [trialSeed(seed, trial) for trial in range(num_trials)]
+    argLists = [[arg] * num_trials for arg in args] + [seeds]
+    if workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            return list(pool.map(trial_function, *argLists,
+                                 chunksize=max(1, num_trials // (4 * workers))))
+    return list(map(trial_function, *argLists))
+
+
+def trialSeed(seed, trial):
+    """
+    Derives the seed of one trial from the seed of a whole simulation, so
+    that every trial has its own reproducible stream of random numbers.
+
+    seed: an int
+    trial: an int, the number of the trial
+    returns: an int
+    """
+    digest = hashlib.sha256(("%d:%d" % (seed, trial)).encode('ascii')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+@contextlib.contextmanager
+def seededRandom(seed):
+    """
+    Runs the body of a with statement with the random module seeded with
+    SEED, then puts back the state the random module had before, so seeding
+    a trial does not make the caller's later random numbers predictable.
+    With a SEED of None the random module is left as it is.
+
+    seed: an int, or None
+    """
+    if seed is None:
+        yield
+        return
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+def runTrial(num_robots, speed, width, height, min_coverage, robot_type,
+             fast_forward=False, room_type=RectangularRoom, seed=None):
+    """
+    Runs a single trial of the simulation and returns the number of
+    time-steps needed to clean the fraction MIN_COVERAGE of the room.  The
+    arguments are those of runSimulation; with a SEED the trial runs on the
+    random module seeded with it (see seededRandom).
+    """
+    with seededRandom(seed):
+        if fast_forward and robot_type is StandardRobot and room_type is RectangularRoom:
+            return runFastForwardTrial(num_robots, speed, width, height, min_coverage)
         #create empty list of robots and instatiate a room
         robotList = []
-        room = RectangularRoom(width, height)
+        room = room_type(width, height)
         #create robots and store in robotList
         for y in range(num_robots):
             robotList.append(robot_type(room, speed))
-        #check if the room is already cleaned enough by instantiating robots
-        cleanedFraction = room.getNumCleanedTiles()/(width * height)
-        if cleanedFraction >= min_coverage:
-            continue
         #while loop adding one to time, cleaning room and and checking cleanliness
-        while room.getNumCleanedTiles()/(width * height) < min_coverage:
-            totalTime += 1
+        timeSteps = 0
+        while room.getNumCleanedTiles()/room.getNumTiles() < min_coverage:
+            timeSteps += 1
             for robot in robotList:
                 robot.updatePositionAndClean()
-    #mean = total time / number of trials
-    return totalTime / num_trials
+        return timeSteps
     
+# runFastForwardTrial marks lines longer than this many steps with numpy
+FAST_FORWARD_VECTOR_STEPS = 40
+
+def runFastForwardTrial(num_robots, speed, width, height, min_coverage):
+    """
+    Runs a single trial with StandardRobots, like runTrial, but works out each
+    robot's path from one wall hit to the next at once instead of stepping
+    every robot every time-step.
+
+    A StandardRobot moves in a straight line until its next step would leave
+    the room, so the number of steps before that happens, and the tiles under
+    each of them, can be worked out as soon as it sets off.  The robots'
+    lines are kept in a heap by the time-step they start on, and each line is
+    played out whole when it comes off the heap: the robot picks its new
+    direction (on the time-step of the wall hit, in the same order as
+    runTrial would), and every tile under the line is given the first
+    time-step at which any robot has cleaned it.  Long lines are marked with
+    numpy, short ones step by step.  Lines start at most one wall hit ahead
+    of each other, so once enough tiles have been given a time-step, the
+    time-step on which the room reached MIN_COVERAGE is final as soon as no
+    line left on the heap starts before it.
+
+    Positions along a line are computed from its start rather than by
+    repeated addition, so the times are statistically the same as runTrial's
+    rather than always identical, although with the same seed they nearly
+    always agree.
+    """
+    room = RectangularRoom(width, height)
+    robots = [StandardRobot(room, speed) for i in range(num_robots)]
+    numTiles = width * height
+    # The fewest clean tiles that meet min_coverage
+    target = max(0, math.ceil(min_coverage * numTiles) - 1)
+    while target / numTiles < min_coverage:
+        target += 1
+    if room.numCleaned >= target:
+        return 0
+    # cleanTicks[tile] is the first time-step on which any line worked out
+    # so far reaches the tile, or never if none does; ticks is the same
+    # memory seen from numpy
+    never = 2 ** 62
+    cleanTicks = array.array('q', [never]) * numTiles
+    ticks = np.frombuffer(cleanTicks, np.int64)
+    for robot in robots:
+        cleanTicks[int(robot.position.x) * height + int(robot.position.y)] = 0
+    numCleaned = room.numCleaned
+    startX = [robot.position.x for robot in robots]
+    startY = [robot.position.y for robot in robots]
+    # (time-step a line starts on, robot), the robot being at the start of
+    # the line on that time-step and taking its first step on the next
+    starts = [(0, i) for i in range(num_robots)]
+    finish = None
+    while True:
+        start, i = starts[0]
+        if finish is not None and start + 1 >= finish:
+            # No line left can clean a tile before finish; lines played out
+            # since it was found can only have brought it forward
+            return int(np.partition(ticks, target - 1)[target - 1])
+        robot = robots[i]
+        if start:
+            robot.direction = random.uniform(0, 360)
+        x, y = startX[i], startY[i]
+        stepX, stepY = robot.stepX, robot.stepY
+        steps = stepsToWall(x, y, stepX, stepY, width, height)
+        if steps > FAST_FORWARD_VECTOR_STEPS:
+            along = np.arange(1, steps + 1)
+            tiles = ((x + along * stepX).astype(np.int64) * height
+                     + (y + along * stepY).astype(np.int64))
+            # A line crosses each tile in one run of steps, so its first
+            # visit to a tile is where the run begins
+            first = np.flatnonzero(np.diff(tiles, prepend=-1))
+            tiles = tiles[first]
+            earlier = start + 1 + first < ticks[tiles]
+            tiles = tiles[earlier]
+            numCleaned += np.count_nonzero(ticks[tiles] == never)
+            ticks[tiles] = start + 1 + first[earlier]
+        else:
+            for step in range(1, steps + 1):
+                tile = int(x + step * stepX) * height + int(y + step * stepY)
+                tick = start + step
+                if cleanTicks[tile] > tick:
+                    if cleanTicks[tile] == never:
+                        numCleaned += 1
+                    cleanTicks[tile] = tick
+        startX[i] = x + steps * stepX
+        startY[i] = y + steps * stepY
+        # The step after the last one would leave the room, so the robot
+        # turns on that time-step instead and starts its next line there
+        heapq.heapreplace(starts, (start + steps + 1, i))
+        if finish is None and numCleaned >= target:
+            finish = int(np.partition(ticks, target - 1)[target - 1])
+
+
+def stepsToWall(x, y, stepX, stepY, width, height):
+    """
+    Returns the number of steps of (stepX, stepY) a robot at (x, y) can take,
+    one after the other, before its next step would leave a WIDTH x HEIGHT
+    room.  Step k puts the robot at (x + k * stepX, y + k * stepY).
+    """
+    if stepX > 0:
+        steps = math.ceil((width - x) / stepX) - 1
+    elif stepX < 0:
+        steps = math.floor(x / -stepX)
+    else:
+        steps = None
+    if stepY > 0:
+        limit = math.ceil((height - y) / stepY) - 1
+    elif stepY < 0:
+        limit = math.floor(y / -stepY)
+    else:
+        limit = steps
+    if steps is None or limit < steps:
+        steps = limit
+    if steps is None:
+        return 0
+    # The formulas can be off by one to rounding; settle it on the real points
+    if steps < 0:
+        steps = 0
+    while steps > 0 and not (0 <= x + steps * stepX < width and 0 <= y + steps * stepY < height):
+        steps -= 1
+    while 0 <= x + (steps + 1) * stepX < width and 0 <= y + (steps + 1) * stepY < height:
+        steps += 1
+    return steps
+
+
+# === Trajectory recording
+def runRecordedTrial(num_robots, speed, width, height, min_coverage,
+                     robot_type, filename, room_type=RectangularRoom,
+                     seed=None, capacity=4096):
+    """
+    Runs a single trial like runTrial (without fast-forwarding), writing the
+    robots' positions and the tiles they clean at every time-step to the
+    trace file FILENAME.  The trace can be analyzed or replayed later with
+    ps2_trace, without running the simulation again.
+
+    capacity: an int, the number of time-steps the TrajectoryRecorder keeps
+              before writing them out
+    returns: the number of time-steps
+    """
+    with seededRandom(seed):
+        room = room_type(width, height)
+        robotList = []
+        for y in range(num_robots):
+            robotList.append(robot_type(room, speed))
+        with TrajectoryRecorder(filename, num_robots, width, height, capacity,
+                                num_tiles=room.getNumTiles()) as recorder:
+            positions = recorder.positions
+            record = recorder.record
+            limit = recorder.limit
+            recorder.recordRobots(robotList)
+            timeSteps = 0
+            while room.getNumCleanedTiles()/room.getNumTiles() < min_coverage:
+                timeSteps += 1
+                for robot in robotList:
+                    robot.updatePositionAndClean()
+                    position = robot.position
+                    record(position.x)
+                    record(position.y)
+                if len(positions) >= limit:
+                    recorder.flush()
+        return timeSteps
+
+
+# === Profiling
+class SimulationProfile(object):
+    """
+    A SimulationProfile collects where the time of profiled trials goes
+    (see runSimulation's PROFILE argument).  Each time-step is split into
+    three phases, timed with time.perf_counter_ns:
+
+    - movement: the robots' updatePositionAndClean, less the tile marking
+    - marking: the room's cleanPointIfInRoom calls made by moving robots,
+      which check the new point and mark its tile
+    - coverage: the check of the clean fraction that ends a trial
+
+    It also counts time-steps, robot steps and the Positions made by moving
+    robots, the net change in allocated memory blocks (sys.getallocatedblocks)
+    and the garbage collections during the trials.  The timer calls add some
+    overhead of their own, so the phases are best compared with each other
+    rather than with unprofiled runs.
+    """
+    def __init__(self):
+        self.trials = 0
+        self.ticks = 0
+        self.robotSteps = 0
+        self.positions = 0
+        self.movementNs = 0
+        self.markingNs = 0
+        self.coverageNs = 0
+        self.totalNs = 0
+        self.allocatedBlocks = 0
+        self.collections = 0
+
+    def merge(self, other):
+        """
+        Adds the counts of another SimulationProfile to this one.
+        """
+        for name, value in vars(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def report(self):
+        """
+        Returns the profile as a dictionary, with the rates worked out from
+        the counts and the total time of the trials.
+
+        returns: a dictionary
+        """
+        seconds = self.totalNs / 1e9
+        def rate(count):
+            return count / seconds if seconds else 0.0
+        return {'trials': self.trials,
+                'ticks': self.ticks,
+                'robotSteps': self.robotSteps,
+                'seconds': seconds,
+                'ticksPerSecond': rate(self.ticks),
+                'robotStepsPerSecond': rate(self.robotSteps),
+                'phasesNs': {'movement': self.movementNs,
+                             'marking': self.markingNs,
+                             'coverage': self.coverageNs},
+                'allocations': {'positions': self.positions,
+                                'netBlocks': self.allocatedBlocks,
+                                'collections': self.collections}}
+
+
+def runProfiledTrial(num_robots, speed, width, height, min_coverage,
+                     robot_type, room_type=RectangularRoom, seed=None):
+    """
+    Runs a single trial like runTrial (without fast-forwarding), timing each
+    phase of every time-step.
+
+    returns: a tuple of the number of time-steps and a SimulationProfile
+    """
+    with seededRandom(seed):
+        profile = SimulationProfile()
+        clock = time.perf_counter_ns
+        room = room_type(width, height)
+        robotList = [robot_type(room, speed) for y in range(num_robots)]
+        cleanPointIfInRoom = room.cleanPointIfInRoom
+        def timedCleanPointIfInRoom(x, y):
+            start = clock()
+            inRoom = cleanPointIfInRoom(x, y)
+            profile.markingNs += clock() - start
+            profile.positions += inRoom
+            return inRoom
+        #robots find cleanPointIfInRoom on the room, so this times their marking
+        room.cleanPointIfInRoom = timedCleanPointIfInRoom
+        collections = sum(stats['collections'] for stats in gc.get_stats())
+        blocks = sys.getallocatedblocks()
+        timeSteps = 0
+        movementNs = 0
+        begin = clock()
+        while True:
+            start = clock()
+            covered = room.getNumCleanedTiles()/room.getNumTiles() >= min_coverage
+            profile.coverageNs += clock() - start
+            if covered:
+                break
+            timeSteps += 1
+            start = clock()
+            for robot in robotList:
+                robot.updatePositionAndClean()
+            movementNs += clock() - start
+        profile.totalNs = clock() - begin
+        profile.allocatedBlocks = sys.getallocatedblocks() - blocks
+        profile.collections = sum(stats['collections'] for stats in gc.get_stats()) - collections
+        profile.movementNs = movementNs - profile.markingNs
+        profile.trials = 1
+        profile.ticks = timeSteps
+        profile.robotSteps = timeSteps * num_robots
+        return timeSteps, profile
+
+
+# === Adaptive precision
+def runSimulationAdaptive(num_robots, speed, width, height, min_coverage,
+                          robot_type, half_width, confidence=0.95, min_trials=8,
+                          max_trials=10000, seed=None, fast_forward=False,
+                          room_type=RectangularRoom):
+    """
+    Runs trials of the simulation until the mean number of time-steps needed
+    to clean the fraction MIN_COVERAGE of the room is known to within
+    HALF_WIDTH time-steps, instead of running a fixed number of trials.
+
+    The mean and variance are kept up to date trial by trial (Welford's
+    method).  After at least MIN_TRIALS trials, running stops as soon as the
+    normal-approximation confidence interval at level CONFIDENCE is no wider
+    than HALF_WIDTH on either side of the mean, or when MAX_TRIALS trials
+    have been run.  Trial i is seeded as in runSimulation, so a SEED makes
+    the result reproducible.  The other arguments are as for runSimulation.
+
+    half_width: a float (half_width > 0)
+    confidence: a float (0 < confidence < 1)
+    min_trials: an int (min_trials >= 2)
+    max_trials: an int (max_trials >= min_trials)
+    returns: a tuple (mean, half-width of its confidence interval, number of
+             trials run)
+    """
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    mean = 0.0
+    sumSquares = 0.0
+    trials = 0
+    interval = math.inf
+    while trials < max_trials:
+        trialSeedValue = None if seed is None else trialSeed(seed, trials)
+        timeSteps = runTrial(num_robots, speed, width, height, min_coverage,
+                             robot_type, fast_forward, room_type, trialSeedValue)
+        trials += 1
+        delta = timeSteps - mean
+        mean += delta / trials
+        sumSquares += delta * (timeSteps - mean)
+        if trials >= 2:
+            interval = z * math.sqrt(sumSquares / (trials - 1) / trials)
+        if trials >= min_trials and interval <= half_width:
+            break
+    return mean, interval, trials
+
+
+# === Coverage curves
+def runCoverageCurves(num_robots, speed, width, height, num_trials, robot_type,
+                      max_coverage=1.0, workers=1, seed=None,
+                      room_type=RectangularRoom):
+    """
+    Runs NUM_TRIALS trials of the simulation once each and records, for every
+    whole percentage of the room from 0 to 100, the first time-step at which
+    that much of the room was clean.  The time for any coverage level can
+    then be read off the curves with coverageTimes or summarizeCoverage
+    instead of running the simulation again for each level.
+
+    Each trial runs until MAX_COVERAGE of the room is clean; levels above
+    that are recorded as -1.  The other arguments are as for runSimulation.
+
+    returns: a list with one array of 101 time-steps per trial
+    """
+    return runTrials(runCoverageTrial, num_trials, workers, seed, num_robots,
+                     speed, width, height, robot_type, max_coverage, room_type)
+
+
+def runCoverageTrial(num_robots, speed, width, height, robot_type,
+                     max_coverage=1.0, room_type=RectangularRoom, seed=None):
+    """
+    Runs a single trial for runCoverageCurves and returns its curve: an array
+    whose entry k is the first time-step at which k percent of the room was
+    clean, or -1 if the trial stopped before then.
+    """
+    with seededRandom(seed):
+        room = room_type(width, height)
+        robotList = [robot_type(room, speed) for y in range(num_robots)]
+        curve = array.array('l', [-1] * 101)
+        level = 0
+        timeSteps = 0
+        while True:
+            # Record every level this time-step has reached
+            coverage = room.getNumCleanedTiles()/room.getNumTiles()
+            while level <= 100 and coverage >= level / 100:
+                curve[level] = timeSteps
+                level += 1
+            if coverage >= max_coverage or level > 100:
+                return curve
+            timeSteps += 1
+            for robot in robotList:
+                robot.updatePositionAndClean()
+
+
+def coverageTimes(curves, min_coverage):
+    """
+    Returns the time-step at which each trial of runCoverageCurves first had
+    the fraction MIN_COVERAGE of the room clean.  A coverage between two whole
+    percentages is rounded up to the next one.  Raises a ValueError if a
+    trial stopped before reaching MIN_COVERAGE.
+
+    curves: a list of curves from runCoverageCurves
+    min_coverage: a float (0 <= min_coverage <= 1.0)
+    returns: a list of ints, one per trial
+    """
+    level = math.ceil(round(min_coverage * 100, 9))
+    times = [curve[level] for curve in curves]
+    if -1 in times:
+        raise ValueError("some trials stopped before reaching coverage %g" % min_coverage)
+    return times
+
+
+def summarizeCoverage(curves, min_coverage, percentiles=(10, 50, 90)):
+    """
+    Summarizes the time-steps needed to clean the fraction MIN_COVERAGE of
+    the room over the trials of runCoverageCurves.
+
+    curves: a list of curves from runCoverageCurves
+    min_coverage: a float (0 <= min_coverage <= 1.0)
+    percentiles: the percentiles (numbers from 0 to 100) to report
+    returns: a dictionary with the keys 'mean', 'median' and one 'pN' key
+             for each percentile N
+    """
+    times = sorted(coverageTimes(curves, min_coverage))
+    summary = {'mean': sum(times) / len(times), 'median': statistics.median(times)}
+    for percentile in percentiles:
+        # Linear interpolation between the closest ranks
+        rank = (len(times) - 1) * percentile / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(times) - 1)
+        summary['p%g' % percentile] = times[low] + (times[high] - times[low]) * (rank - low)
+    return summary
+
+
 # Uncomment this line to see how much your simulation takes on average
 # runSimulation(num_robots, speed, width, height, min_coverage, num_trials,robot_type)
 # print(runSimulation(1, 2.0, 5, 5, 1, 30, StandardRobot))
@@ -305,6 +1135,10 @@ def runSimulation(num_robots, speed, width, height, min_coverage, num_trials,
 # print(runSimulation(3, 10.0, 20, 20, 1, 30, StandardRobot))
 
 # === Problem 5
+# sin and cos of each heading a RandomWalkRobot can take
+WALK_UNIT_STEPS = dict((angle, (math.sin(math.radians(angle)), math.cos(math.radians(angle))))
+                       for angle in (0.0, 90.0, 180.0, 270.0))
+
 class RandomWalkRobot(Robot):
     """
     A RandomWalkRobot is a robot with the "random walk" movement strategy: it
@@ -320,28 +1154,32 @@ class RandomWalkRobot(Robot):
         #Create list to store possible move directions
         possibleMoves = []
         #Get x and and y coordinates
-        x = self.position.getX()
-        y = self.position.getY()
+        x = self.position.x
+        y = self.position.y
+        direction = self.heading
         #Check which moves are possible and add to list
-        if x >= self.speed and self.direction != 270:
+        if x >= self.speed and direction != 270:
             possibleMoves.append(270)
-        if x < self.room.width - self.speed and self.direction != 90:
+        if x < self.room.width - self.speed and direction != 90:
             possibleMoves.append(90)
-        if y >= self.speed and self.direction != 180:
+        if y >= self.speed and direction != 180:
             possibleMoves.append(180)
-        if y < self.room.height - self.speed and self.direction != 0:
+        if y < self.room.height - self.speed and direction != 0:
             possibleMoves.append(0)
         #Check that there is a possible move.
         if possibleMoves == []:
             print("There are no possible moves, ending this robot's simulation.")
             return 1
-        #Pick an available direction of travel
-        self.direction = random.choice(possibleMoves)
+        #Pick an available direction of travel, using the stored sin and cos
+        self.heading = random.choice(possibleMoves)
+        unitX, unitY = WALK_UNIT_STEPS[self.heading]
+        self.stepX = self.speed * unitX
+        self.stepY = self.speed * unitY
         #Execute move
-        nextPos = self.position.getNewPosition(self.direction, self.speed)
-        if self.room.isPositionInRoom(nextPos):
-            self.position = nextPos
-            self.room.cleanTileAtPosition(nextPos) 
+        x = self.position.x + self.stepX
+        y = self.position.y + self.stepY
+        if self.room.cleanPointIfInRoom(x, y):
+            self.position = Position(x, y)
 
 
 # Uncomment this line to see how much your simulation takes on average
@@ -353,17 +1191,348 @@ class RandomWalkRobot(Robot):
 # print(runSimulation(3, 10.0, 20, 20, 1, 30, RandomWalkRobot))
 
 
-def showPlot1(title, x_label, y_label):
+# === Vectorized fleet
+# Headings a RandomWalkRobot may take, and the step each one makes
+WALK_DIRECTIONS = np.array([270, 90, 180, 0])
+WALK_STEP_X = np.array([-1.0, 1.0, 0.0, 0.0])
+WALK_STEP_Y = np.array([0.0, 0.0, -1.0, 1.0])
+
+class RobotFleet(object):
+    """
+    A RobotFleet simulates every robot in a room at once, for one or more
+    independent trials side by side.  Instead of one Robot object per robot
+    it keeps the positions, directions and per-tick steps of all robots in
+    (trials x robots) NumPy arrays, and the rooms as one flat array of clean
+    flags per trial, so a time-step is a handful of array operations however
+    many robots and trials there are.
+
+    The fleet follows the movement strategy of StandardRobot or
+    RandomWalkRobot.
+    """
+    def __init__(self, num_robots, speed, width, height, robot_type, num_trials=1,
+                 rng=None):
+        """
+        For each of NUM_TRIALS trials, places NUM_ROBOTS robots of type
+        ROBOT_TYPE with speed SPEED at random positions, with random
+        directions, in its own WIDTH x HEIGHT room, and cleans the tiles they
+        start on.  Random numbers come from RNG (a numpy Generator), or from
+        numpy.random if it is None.
+
+        num_robots: an int (num_robots > 0)
+        speed: a float (speed > 0)
+        width: an int (width > 0)
+        height: an int (height > 0)
+        robot_type: StandardRobot or RandomWalkRobot
+        num_trials: an int (num_trials > 0)
+        rng: a numpy.random.Generator, or None
+        """
+        self.random = np.random if rng is None else rng
+        shape = (num_trials, num_robots)
+        self.speed = speed
+        self.width = width
+        self.height = height
+        self.randomWalk = issubclass(robot_type, RandomWalkRobot)
+        self.x = self.random.uniform(0, width, shape)
+        self.y = self.random.uniform(0, height, shape)
+        self.direction = self.random.uniform(0, 360, shape)
+        self.stepX = np.empty(shape)
+        self.stepY = np.empty(shape)
+        self.setSteps(np.ones(shape, dtype=bool))
+        # Tile t of trial i is cleaned[i * width * height + t]
+        self.trialOffset = np.arange(num_trials)[:, None] * (width * height)
+        self.cleaned = np.zeros(num_trials * width * height, dtype=bool)
+        self.numCleaned = np.zeros(num_trials, dtype=np.intp)
+        self.cleanTiles(np.ones(shape, dtype=bool))
+
+    def setSteps(self, robots):
+        """
+        Recomputes the per-tick steps of the robots selected by the boolean
+        array ROBOTS from their directions.
+        """
+        angle = np.radians(self.direction[robots])
+        self.stepX[robots] = self.speed * np.sin(angle)
+        self.stepY[robots] = self.speed * np.cos(angle)
+
+    def cleanTiles(self, robots):
+        """
+        Marks the tiles under the robots selected by the boolean array ROBOTS
+        as cleaned.
+        """
+        tiles = (self.trialOffset + self.x.astype(np.intp) * self.height
+                 + self.y.astype(np.intp))[robots]
+        fresh = np.unique(tiles[~self.cleaned[tiles]])
+        self.cleaned[fresh] = True
+        self.numCleaned += np.bincount(fresh // (self.width * self.height),
+                                       minlength=len(self.numCleaned))
+
+    def getNumCleanedTiles(self):
+        """
+        Return the number of clean tiles in the room of each trial (an array).
+        """
+        return self.numCleaned
+
+    def chooseWalkDirections(self, robots):
+        """
+        Gives the robots selected by the boolean array ROBOTS a new direction
+        the way RandomWalkRobot does: one of the four headings that keeps it
+        in the room, other than the one it has.  A robot with no such heading
+        stays where it is.
+        """
+        speed = self.speed
+        possible = np.stack([self.x >= speed,
+                             self.x < self.width - speed,
+                             self.y >= speed,
+                             self.y < self.height - speed], axis=-1)
+        possible &= self.direction[..., None] != WALK_DIRECTIONS
+        count = possible.sum(axis=-1)
+        # Pick the k-th possible heading of each robot, k uniform in [0, count)
+        k = np.floor(self.random.random(count.shape) * count)
+        choice = np.argmax(np.cumsum(possible, axis=-1) > k[..., None], axis=-1)
+        moving = robots & (count > 0)
+        self.direction = np.where(moving, WALK_DIRECTIONS[choice], self.direction)
+        self.stepX = np.where(moving, speed * WALK_STEP_X[choice], 0.0)
+        self.stepY = np.where(moving, speed * WALK_STEP_Y[choice], 0.0)
+
+    def updatePositionsAndClean(self, trials=None):
+        """
+        Simulate the passage of a single time-step for every robot.
+
+        Robots whose next position is in the room move there and clean their
+        tile.  A StandardRobot that would leave the room stays put and picks a
+        new random direction instead.
+
+        trials: a boolean array choosing the trials to advance, or None for
+                all of them
+        """
+        robots = np.ones(self.x.shape, dtype=bool)
+        if trials is not None:
+            robots &= trials[:, None]
+        if self.randomWalk:
+            self.chooseWalkDirections(robots)
+        newX = self.x + self.stepX
+        newY = self.y + self.stepY
+        inside = robots & (newX >= 0) & (newY >= 0) & (newX < self.width) & (newY < self.height)
+        self.x = np.where(inside, newX, self.x)
+        self.y = np.where(inside, newY, self.y)
+        self.cleanTiles(inside)
+        if not self.randomWalk:
+            bounced = robots & ~inside
+            self.direction[bounced] = self.random.uniform(0, 360, np.count_nonzero(bounced))
+            self.setSteps(bounced)
+
+
+def runSimulationVectorized(num_robots, speed, width, height, min_coverage,
+                            num_trials, robot_type):
+    """
+    Runs NUM_TRIALS trials of the simulation with a RobotFleet and returns the
+    mean number of time-steps needed to clean the fraction MIN_COVERAGE of the
+    room, like runSimulation.
+
+    num_robots: an int (num_robots > 0)
+    speed: a float (speed > 0)
+    width: an int (width > 0)
+    height: an int (height > 0)
+    min_coverage: a float (0 <= min_coverage <= 1.0)
+    num_trials: an int (num_trials > 0)
+    robot_type: StandardRobot or RandomWalkRobot
+    """
+    totalTime = 0
+    for x in range(num_trials):
+        fleet = RobotFleet(num_robots, speed, width, height, robot_type)
+        while fleet.getNumCleanedTiles()[0]/(width * height) < min_coverage:
+            totalTime += 1
+            fleet.updatePositionsAndClean()
+    return totalTime / num_trials
+
+
+def runSimulationBatched(num_robots, speed, width, height, min_coverage,
+                         num_trials, robot_type, seed=None):
+    """
+    Runs all NUM_TRIALS trials of the simulation at once in one RobotFleet and
+    returns the mean number of time-steps needed to clean the fraction
+    MIN_COVERAGE of the room, like runSimulation.
+
+    Every time-step advances all the trials that have not reached
+    MIN_COVERAGE yet; a trial that reaches it records the time-step and is
+    left alone from then on.  With a SEED the fleet draws its random numbers
+    from numpy.random.default_rng(SEED), so the result depends only on the
+    seed.
+
+    num_robots: an int (num_robots > 0)
+    speed: a float (speed > 0)
+    width: an int (width > 0)
+    height: an int (height > 0)
+    min_coverage: a float (0 <= min_coverage <= 1.0)
+    num_trials: an int (num_trials > 0)
+    robot_type: StandardRobot or RandomWalkRobot
+    seed: an int, or None to use numpy.random as it is
+    """
+    rng = None if seed is None else np.random.default_rng(seed)
+    fleet = RobotFleet(num_robots, speed, width, height, robot_type, num_trials, rng)
+    finishTimes = np.zeros(num_trials, dtype=np.intp)
+    running = fleet.getNumCleanedTiles()/(width * height) < min_coverage
+    timeStep = 0
+    while running.any():
+        timeStep += 1
+        fleet.updatePositionsAndClean(running)
+        finished = running & (fleet.getNumCleanedTiles()/(width * height) >= min_coverage)
+        finishTimes[finished] = timeStep
+        running &= ~finished
+    return float(finishTimes.sum() / num_trials)
+
+
+# === Parameter sweeps
+# Where showPlot1 and showPlot2 keep the results of their sweeps
+SWEEP_DIRECTORY = 'ps2_sweeps'
+
+# The parameters that make up a point of a sweep, in runSimulation order
+SWEEP_PARAMETERS = ('num_robots', 'speed', 'width', 'height', 'min_coverage',
+                    'robot_type')
+
+def sweepGrid(**values):
+    """
+    Returns every combination of the given parameter values as a list of
+    sweep points, for example sweepGrid(num_robots=range(1, 11), speed=[1.0],
+    width=[20], height=[20], min_coverage=[0.8],
+    robot_type=[StandardRobot, RandomWalkRobot]).
+
+    values: a list of values for each name in SWEEP_PARAMETERS
+    returns: a list of dictionaries, one per point
+    """
+    lists = [list(values[name]) for name in SWEEP_PARAMETERS]
+    return [dict(zip(SWEEP_PARAMETERS, combination))
+            for combination in itertools.product(*lists)]
+
+
+class SweepStore(object):
+    """
+    A SweepStore keeps the results of finished sweep points in a directory,
+    one small JSON file per point, named after a hash of the point's
+    parameters, number of trials and seed.  Files are written in one step, so
+    a sweep that is interrupted loses at most the points it was working on.
+    """
+    def __init__(self, directory=SWEEP_DIRECTORY):
+        """
+        Opens (creating it if need be) the store in DIRECTORY (a string).
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def describe(self, point, num_trials, seed, batched=False):
+        """
+        Returns the parameters of a run as a dictionary that can be written
+        as JSON, with the robot type given by its name and the engine that
+        ran it (runSimulation or runSimulationBatched, which give different
+        results for the same seed).
+        """
+        description = dict(point)
+        description['robot_type'] = point['robot_type'].__name__
+        description['num_trials'] = num_trials
+        description['seed'] = seed
+        description['engine'] = 'batched' if batched else 'trials'
+        return description
+
+    def path(self, point, num_trials, seed, batched=False):
+        """
+        Returns the file the result of a run is stored in.
+        """
+        text = json.dumps(self.describe(point, num_trials, seed, batched), sort_keys=True)
+        return os.path.join(self.directory,
+                            hashlib.sha256(text.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, point, num_trials, seed, batched=False):
+        """
+        Returns the stored mean time-steps of a run, or None if it has not
+        been run.
+        """
+        try:
+            with open(self.path(point, num_trials, seed, batched)) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored['point'] != self.describe(point, num_trials, seed, batched):
+            return None
+        return stored['mean']
+
+    def put(self, point, num_trials, seed, mean, batched=False):
+        """
+        Stores the mean time-steps of a run.
+        """
+        filename = self.path(point, num_trials, seed, batched)
+        temporary = filename + '.' + str(os.getpid()) + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'point': self.describe(point, num_trials, seed, batched),
+                       'mean': mean}, f)
+        os.replace(temporary, filename)
+
+
+def runSweepPoint(point, num_trials, seed, batched=False):
+    """
+    Runs runSimulation, or runSimulationBatched if BATCHED, for one sweep
+    point (in a worker process for runSweep) and returns the mean time-steps.
+    """
+    if batched:
+        return runSimulationBatched(point['num_robots'], point['speed'], point['width'],
+                                    point['height'], point['min_coverage'], num_trials,
+                                    point['robot_type'], seed=seed)
+    return runSimulation(point['num_robots'], point['speed'], point['width'],
+                         point['height'], point['min_coverage'], num_trials,
+                         point['robot_type'], seed=seed)
+
+
+def runSweep(points, num_trials, store=None, seed=0, workers=1, batched=False):
+    """
+    Runs runSimulation with NUM_TRIALS trials and the given SEED for each
+    sweep point, spreading the points over WORKERS processes, and returns the
+    mean time-steps of each point.  With BATCHED, each point runs all its
+    trials at once with runSimulationBatched instead.
+
+    Points already in STORE are not run again, and each point is stored as
+    soon as it finishes, so a sweep can be resumed after an interruption and
+    a grid can be extended by computing only its new points.
+
+    points: a list of dictionaries giving a value to each name in
+            SWEEP_PARAMETERS (see sweepGrid)
+    num_trials: an int (num_trials > 0)
+    store: a SweepStore, or None for SweepStore()
+    seed: an int
+    workers: an int, the number of processes to run the points in
+    batched: a bool
+    returns: a list of the mean time-steps of each point, in order
+    """
+    if store is None:
+        store = SweepStore()
+    means = [store.get(point, num_trials, seed, batched) for point in points]
+    missing = [i for i in range(len(points)) if means[i] is None]
+    if workers > 1 and missing:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            futures = dict((pool.submit(runSweepPoint, points[i], num_trials, seed, batched), i)
+                           for i in missing)
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                means[i] = future.result()
+                store.put(points[i], num_trials, seed, means[i], batched)
+    else:
+        for i in missing:
+            means[i] = runSweepPoint(points[i], num_trials, seed, batched)
+            store.put(points[i], num_trials, seed, means[i], batched)
+    return means
+
+
+def showPlot1(title, x_label, y_label, store=None, workers=1):
     """
     What information does the plot produced by this function tell you?
+
+    The simulations are run (or read back) with batched runSweep and STORE.
     """
     num_robot_range = range(1, 11)
-    times1 = []
-    times2 = []
-    for num_robots in num_robot_range:
-        print("Plotting", num_robots, "robots...")
-        times1.append(runSimulation(num_robots, 1.0, 20, 20, 0.8, 20, StandardRobot))
-        times2.append(runSimulation(num_robots, 1.0, 20, 20, 0.8, 20, RandomWalkRobot))
+    points = sweepGrid(num_robots=num_robot_range, speed=[1.0], width=[20],
+                       height=[20], min_coverage=[0.8],
+                       robot_type=[StandardRobot, RandomWalkRobot])
+    print("Plotting 1 to 10 robots...")
+    means = runSweep(points, 20, store, workers=workers, batched=True)
+    times1 = [mean for point, mean in zip(points, means) if point['robot_type'] is StandardRobot]
+    times2 = [mean for point, mean in zip(points, means) if point['robot_type'] is RandomWalkRobot]
     pylab.plot(num_robot_range, times1)
     pylab.plot(num_robot_range, times2)
     pylab.title(title)
@@ -373,19 +1542,24 @@ def showPlot1(title, x_label, y_label):
     pylab.show()
 
     
-def showPlot2(title, x_label, y_label):
+def showPlot2(title, x_label, y_label, store=None, workers=1):
     """
     What information does the plot produced by this function tell you?
+
+    The simulations are run (or read back) with batched runSweep and STORE.
     """
     aspect_ratios = []
-    times1 = []
-    times2 = []
+    points = []
     for width in [10, 20, 25, 50]:
         height = 300//width
         print("Plotting cleaning time for a room of width:", width, "by height:", height)
         aspect_ratios.append(float(width) / height)
-        times1.append(runSimulation(2, 1.0, width, height, 0.8, 200, StandardRobot))
-        times2.append(runSimulation(2, 1.0, width, height, 0.8, 200, RandomWalkRobot))
+        points += sweepGrid(num_robots=[2], speed=[1.0], width=[width],
+                            height=[height], min_coverage=[0.8],
+                            robot_type=[StandardRobot, RandomWalkRobot])
+    means = runSweep(points, 200, store, workers=workers, batched=True)
+    times1 = means[0::2]
+    times2 = means[1::2]
     pylab.plot(aspect_ratios, times1)
     pylab.plot(aspect_ratios, times2)
     pylab.title(title)
@@ -404,11 +1578,13 @@ def showPlot2(title, x_label, y_label):
 #
 #       (... your call here ...)
 #
-showPlot1("Time It Takes 1 - 10 Robots To Clean 80% Of A Room", "Number of Robots", "Time Steps")
+if __name__ == '__main__':
+    showPlot1("Time It Takes 1 - 10 Robots To Clean 80% Of A Room", "Number of Robots", "Time Steps")
 #
 # 2) Write a function call to showPlot2 that generates an appropriately-labeled
 #     plot.
 #
 #       (... your call here ...)
 #
-showPlot2("Time It Takes Two Robots To Clean 80% Of Variously Shaped Rooms", "Aspect Ratio", "Time Steps")
+if __name__ == '__main__':
+    showPlot2("Time It Takes Two Robots To Clean 80% Of Variously Shaped Rooms", "Aspect Ratio", "Time Steps")
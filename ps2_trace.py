@@ -0,0 +1,367 @@
+# 6.00.2x Problem Set 2: Recording and replaying robot trajectories
+#
+# A trace file starts with TRACE_HEADER and is followed by blocks, each a
+# TRACE_BLOCK header and four arrays of little-endian ints:
+#
+# - the positions of every robot at every time-step of the block, as
+#   fixed-point (x, y) pairs (x * scale rounded down, so a fixed-point
+#   position is always on the same tile as the real one) given as the change
+#   from the robot's previous position, in 16 bits
+# - the ticks of the tiles cleaned during the block, each given as the change
+#   from the previous clean event's tick, in 16 bits
+# - the tiles cleaned, as m * height + n, in 32 bits, or in 64 bits if the
+#   room has more than 2^32 tiles
+# - the values of the first two arrays that do not fit in 16 bits, in 64
+#   bits and in order; each is stored in its own place as TRACE_ESCAPE
+#
+# Tick 0 holds the robots' starting positions and the tiles they cleaned
+# when placed in the room.  Robots clean the tile under every position they
+# reach, so the recorder finds the clean events itself, from the positions,
+# when it writes a block; all the simulation has to do at each time-step is
+# hand over each robot's coordinates.
+
+import argparse
+import json
+import math
+import struct
+import sys
+
+import numpy as np
+
+TRACE_MAGIC = b'PS2T'
+TRACE_VERSION = 3
+# magic, version, number of robots, width, height, fixed-point scale, number
+# of tiles that can be cleaned
+TRACE_HEADER = struct.Struct('<4sHIIIIQ')
+# first tick, number of ticks, number of clean events, number of escaped values
+TRACE_BLOCK = struct.Struct('<IIII')
+TRACE_ESCAPE = -2 ** 15
+
+
+def narrowInts(values):
+    """
+    Splits an array of ints into the 16-bit array stored in a trace, with
+    TRACE_ESCAPE in place of each value that does not fit, and an array of
+    the values that do not fit.
+
+    values: a numpy array of ints
+    returns: a tuple of two numpy arrays, of int16 and int64
+    """
+    escaped = (values <= TRACE_ESCAPE) | (values > 2 ** 15 - 1)
+    narrow = values.astype(np.int16)
+    narrow[escaped] = TRACE_ESCAPE
+    return narrow, values[escaped].astype(np.int64)
+
+
+def widenInts(narrow, escapes):
+    """
+    Undoes narrowInts, returning the values as an array of int64.
+    """
+    values = narrow.astype(np.int64)
+    values[narrow == TRACE_ESCAPE] = escapes
+    return values
+
+
+def tileType(width, height):
+    """
+    Returns the numpy dtype a trace uses for the tiles of a WIDTH x HEIGHT
+    room.
+    """
+    return '<u4' if width * height <= 2 ** 32 else '<u8'
+
+
+class TrajectoryRecorder(object):
+    """
+    A TrajectoryRecorder writes the positions of a group of robots and the
+    tiles they clean to a trace file.
+
+    The simulation passes the x and then the y of each robot, in order, to
+    record() after every time-step (and once before the first), and calls
+    flush() whenever len(positions) reaches limit, which is CAPACITY
+    time-steps.  record() is the append method of the positions list itself,
+    so recording costs two calls per robot step; the conversion to fixed
+    point, the delta encoding and the search for newly cleaned tiles are done
+    with numpy a block at a time.  The list is emptied after each block, so
+    memory does not grow with the length of the simulation.
+
+    The tiles cleaned so far are kept as a bitmap of the whole room.  It is
+    made with numpy.zeros, whose pages most systems only allocate once a bit
+    in them is set, so a very large room costs memory roughly in proportion
+    to the part of it the robots have visited.
+    """
+    def __init__(self, filename, num_robots, width, height, capacity=4096,
+                 scale=1024, num_tiles=None):
+        """
+        Creates the trace file FILENAME for NUM_ROBOTS robots in a room of
+        dimensions WIDTH x HEIGHT.  Raises a ValueError if a coordinate in
+        that room does not fit in 32 bits of fixed point at SCALE.
+
+        capacity: an int, the number of time-steps kept before writing a block
+        scale: an int, the number of fixed-point units per unit of distance
+        num_tiles: an int, the number of tiles that can be cleaned (the room's
+                   getNumTiles()), or None for WIDTH * HEIGHT
+        """
+        if max(width, height) * scale >= 2 ** 31:
+            raise ValueError("a %d x %d room is too large to trace at scale %d"
+                             % (width, height, scale))
+        if num_tiles is None:
+            num_tiles = width * height
+        self.file = open(filename, 'wb')
+        self.file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, num_robots,
+                                          width, height, scale, num_tiles))
+        self.numRobots = num_robots
+        self.height = height
+        self.scale = scale
+        self.tileType = tileType(width, height)
+        self.positions = []
+        self.record = self.positions.append
+        self.limit = 2 * capacity * num_robots
+        self.previous = np.zeros((1, num_robots, 2), np.int64)
+        self.cleaned = np.zeros((width * height + 7) // 8, np.uint8)
+        self.firstTick = 0      # tick number of the next block's first tick
+        self.lastEvent = 0      # tick of the last clean event
+
+    def recordRobots(self, robots):
+        """
+        Records the positions of ROBOTS (a list of NUM_ROBOTS robots) at the
+        end of a time-step, flushing a block if need be.
+        """
+        for robot in robots:
+            self.record(robot.position.x)
+            self.record(robot.position.y)
+        if len(self.positions) >= self.limit:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the time-steps recorded since the last block as a new block.
+        """
+        positions = self.positions
+        if not positions:
+            return
+        count = len(positions) // 2
+        ticks = count // self.numRobots
+        points = np.fromiter(positions, np.float64, 2 * count)
+        del positions[:]
+        fixed = np.floor(points * self.scale).astype(np.int64).reshape(ticks, self.numRobots, 2)
+        deltas = np.diff(fixed, axis=0, prepend=self.previous)
+        self.previous = fixed[-1:]
+        # The room finds a point's tile by truncating its coordinates too
+        whole = points.astype(np.int64)
+        tiles = whole[0::2] * self.height + whole[1::2]
+        # A tile is cleaned the first time any robot reaches it, so only the
+        # tiles not in the bitmap yet need sorting
+        dirty = (self.cleaned[tiles >> 3] >> (tiles & 7).astype(np.uint8)) & 1 == 0
+        tiles, first = np.unique(tiles[dirty], return_index=True)
+        first = np.flatnonzero(dirty)[first]
+        np.bitwise_or.at(self.cleaned, tiles >> 3, np.left_shift(1, tiles & 7).astype(np.uint8))
+        order = np.argsort(first)
+        events = np.empty((len(order), 2), np.int64)
+        events[:, 0] = self.firstTick + first[order] // self.numRobots
+        events[:, 1] = tiles[order]
+        if len(events):
+            eventTicks = events[:, 0].copy()
+            events[:, 0] = np.diff(eventTicks, prepend=self.lastEvent)
+            self.lastEvent = int(eventTicks[-1])
+        narrow, escapes = narrowInts(np.concatenate((deltas.ravel(), events[:, 0])))
+        self.file.write(TRACE_BLOCK.pack(self.firstTick, ticks, len(events), len(escapes)))
+        self.file.write(narrow.astype('<i2').tobytes())
+        self.file.write(events[:, 1].astype(self.tileType).tobytes())
+        self.file.write(escapes.astype('<i8').tobytes())
+        self.firstTick += ticks
+
+    def close(self):
+        """
+        Writes any remaining time-steps and closes the trace file.
+        """
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Trajectory(object):
+    """
+    A Trajectory reads back a trace file written by a TrajectoryRecorder.
+    """
+    def __init__(self, filename):
+        """
+        Opens the trace file FILENAME and reads its header.
+
+        Raises ValueError if FILENAME is not a trace file.
+        """
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            header = f.read(TRACE_HEADER.size)
+        if len(header) < TRACE_HEADER.size:
+            raise ValueError("%s is not a trajectory trace" % filename)
+        (magic, version, self.numRobots, self.width, self.height, self.scale,
+         self.numTiles) = TRACE_HEADER.unpack(header)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError("%s is not a version %d trajectory trace"
+                             % (filename, TRACE_VERSION))
+
+    def blocks(self):
+        """
+        Yields a tuple (first_tick, positions, events) for each block, where
+        positions is an array of the fixed-point (x, y) of every robot at
+        every time-step of the block (shape ticks x robots x 2) and events is
+        an array of the (tick, tile) of each tile cleaned during the block.
+        """
+        previous = np.zeros((1, self.numRobots, 2), np.int64)
+        tick = 0
+        tiles = np.dtype(tileType(self.width, self.height))
+        with open(self.filename, 'rb') as f:
+            f.seek(TRACE_HEADER.size)
+            while True:
+                header = f.read(TRACE_BLOCK.size)
+                if len(header) < TRACE_BLOCK.size:
+                    return
+                firstTick, ticks, numEvents, numEscapes = TRACE_BLOCK.unpack(header)
+                numDeltas = 2 * self.numRobots * ticks
+                narrow = np.frombuffer(f.read(2 * (numDeltas + numEvents)), '<i2')
+                eventTiles = np.frombuffer(f.read(tiles.itemsize * numEvents), tiles)
+                values = widenInts(narrow, np.frombuffer(f.read(8 * numEscapes), '<i8'))
+                positions = values[:numDeltas].reshape(ticks, self.numRobots, 2)
+                positions = np.cumsum(positions, axis=0) + previous
+                previous = positions[-1:]
+                events = np.empty((numEvents, 2), np.int64)
+                events[:, 0] = tick + np.cumsum(values[numDeltas:])
+                events[:, 1] = eventTiles
+                if numEvents:
+                    tick = int(events[-1, 0])
+                yield firstTick, positions, events
+
+    def ticks(self):
+        """
+        Yields a tuple (tick, positions, cleaned) for each recorded time-step,
+        where positions is a list of the (x, y) of each robot and cleaned is
+        a list of the (m, n) of the tiles cleaned during that time-step.
+        """
+        for firstTick, positions, events in self.blocks():
+            cleaned = {}
+            for tick, tile in events.tolist():
+                cleaned.setdefault(tick, []).append(divmod(tile, self.height))
+            points = (positions / self.scale).tolist()
+            for t in range(len(points)):
+                yield (firstTick + t, [tuple(point) for point in points[t]],
+                       cleaned.get(firstTick + t, []))
+
+
+def analyzeTrajectory(filename, coverages=(0.25, 0.5, 0.75, 0.9, 1.0)):
+    """
+    Summarizes a trace file: the number of time-steps, the distance each
+    robot travelled, the number of tiles cleaned and the first time-step by
+    which each of the fractions COVERAGES of the room was clean.
+
+    returns: a dictionary
+    """
+    trajectory = Trajectory(filename)
+    numTiles = trajectory.numTiles
+    distances = np.zeros(trajectory.numRobots)
+    reached = {}
+    last = None
+    numCleaned = 0
+    numTicks = 0
+    for firstTick, positions, events in trajectory.blocks():
+        numTicks += len(positions)
+        if last is not None:
+            positions = np.concatenate((last, positions))
+        last = positions[-1:]
+        steps = np.diff(positions, axis=0) / trajectory.scale
+        distances += np.hypot(steps[:, :, 0], steps[:, :, 1]).sum(axis=0)
+        for coverage in coverages:
+            needed = math.ceil(coverage * numTiles) - numCleaned
+            if coverage not in reached and 0 < needed <= len(events):
+                reached[coverage] = int(events[needed - 1, 0])
+            elif coverage not in reached and needed <= 0:
+                reached[coverage] = firstTick
+        numCleaned += len(events)
+    return {'robots': trajectory.numRobots,
+            'width': trajectory.width,
+            'height': trajectory.height,
+            'timeSteps': max(numTicks - 1, 0),
+            'tilesCleaned': numCleaned,
+            'coverage': numCleaned / numTiles,
+            'distances': distances.tolist(),
+            'coverageTimes': dict((str(coverage), reached.get(coverage))
+                                  for coverage in coverages)}
+
+
+class ReplayRobot(object):
+    """
+    Stands in for a robot when a trace is shown with ps2_visualize.
+    """
+    def __init__(self, position, direction):
+        self.position = position
+        self.direction = direction
+
+    def getRobotPosition(self):
+        return self.position
+
+    def getRobotDirection(self):
+        return self.direction
+
+
+def replayTrajectory(filename, delay=0.2):
+    """
+    Shows a trace file with ps2_visualize, one time-step at a time.
+    Needs a display, as well as ps2_visualize and ps2 itself.
+    """
+    import ps2_visualize
+    from ps2 import Position, RectangularRoom
+    trajectory = Trajectory(filename)
+    room = RectangularRoom(trajectory.width, trajectory.height)
+    robots = [ReplayRobot(None, 0) for r in range(trajectory.numRobots)]
+    anim = ps2_visualize.RobotVisualization(trajectory.numRobots, trajectory.width,
+                                            trajectory.height, delay)
+    for tick, positions, cleaned in trajectory.ticks():
+        for m, n in cleaned:
+            room.cleanTileAt(m, n)
+        for robot, (x, y) in zip(robots, positions):
+            if robot.position is not None and (x, y) != (robot.position.x, robot.position.y):
+                robot.direction = math.degrees(math.atan2(x - robot.position.x,
+                                                          y - robot.position.y)) % 360
+            robot.position = Position(x, y)
+        anim.update(room, robots)
+    anim.done()
+
+
+def main(argv=None):
+    """
+    Analyzes trace files, writing one line of JSON per file to standard
+    output, or replays one with --replay.
+
+    Parameters:
+    argv - the command line arguments (a list of strings), or None for sys.argv
+
+    Returns:
+    the exit status: 0 if every trace could be read, 1 otherwise
+    """
+    parser = argparse.ArgumentParser(description="Analyze or replay robot trajectory traces.")
+    parser.add_argument('traces', nargs='+', help="trace files written by TrajectoryRecorder")
+    parser.add_argument('--replay', action='store_true', help="show the traces with ps2_visualize")
+    parser.add_argument('--delay', type=float, default=0.2, help="seconds between replayed time-steps")
+    args = parser.parse_args(argv)
+
+    status = 0
+    for filename in args.traces:
+        try:
+            if args.replay:
+                replayTrajectory(filename, args.delay)
+                continue
+            result = analyzeTrajectory(filename)
+        except (OSError, ValueError) as e:
+            result = {'error': str(e)}
+            status = 1
+        result['trace'] = filename
+        sys.stdout.write(json.dumps(result) + '\n')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())